@@ -61,6 +61,8 @@ Educational Objectives:
     - Security audit and compliance
 """
 
+from types import MappingProxyType
+
 from server import authenticate, authorize
 from client import main as client_main
 
@@ -101,9 +103,11 @@ PROJECT_INFO = {
     }
 }
 
+_PROJECT_INFO_VIEW = MappingProxyType(PROJECT_INFO)
+
 def get_project_info():
-    """Return project information dictionary"""
-    return PROJECT_INFO.copy()
+    """Return a read-only view of the project information dictionary"""
+    return _PROJECT_INFO_VIEW
 
 def print_project_info():
     """Print formatted project information"""
@@ -2,15 +2,158 @@
 Interactive SFTP client with full command support:
 Commands: pwd, ls, get, put, mkdir, stat, exit
 """
-import asyncio, asyncssh, sys, os
-from pathlib import Path
+import asyncio, asyncssh, sys, os, glob, posixpath, signal, threading, stat, time
 
 KNOWN_HOSTS_FILE = os.path.join(os.path.dirname(__file__), "known_hosts")
 
+# Transfer tuning: keep several FXP_READ/FXP_WRITE requests in flight so
+# high-latency links aren't limited by one round-trip per block, while
+# requests x block size stays at 4 MiB per transfer
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_MAX_REQUESTS = 16
+# Large SSH channel window/packets so blocks aren't split and stalled
+CHANNEL_WINDOW = 4 * 1024 * 1024
+CHANNEL_MAX_PKTSIZE = 1024 * 1024
+# Upper bound on concurrent transfers sharing one SFTP channel; with the
+# defaults above at most 16 MiB of requests is outstanding at once
+MAX_PARALLEL_TRANSFERS = 4
+# SSH-level keepalive so an idle connection stays up while the user types
+KEEPALIVE_INTERVAL = 30
+# Prefer AEAD ciphers (AES-GCM runs on AES-NI) and skip compression, which
+# only burns CPU on already-compressed or binary payloads
+ENCRYPTION_ALGS = ["aes128-gcm@openssh.com", "aes256-gcm@openssh.com", "chacha20-poly1305@openssh.com"]
+KEX_ALGS = ["curve25519-sha256", "curve25519-sha256@libssh.org"]
+# How long (non-symlink) attrs seen in an ls listing may answer a later stat
+STAT_CACHE_TTL = 5.0
+
+def parse_transfer_opts(args):
+    """
+    Split --block-size/--max-requests options from positional arguments.
+    Raises ValueError unless each value is a positive integer.
+    """
+    opts = {"block_size": DEFAULT_BLOCK_SIZE, "max_requests": DEFAULT_MAX_REQUESTS}
+    flags = {"--block-size": "block_size", "--max-requests": "max_requests"}
+    positional = []
+    it = iter(args)
+    for arg in it:
+        key, _, value = arg.partition("=")
+        if key in flags:
+            if not value:
+                value = next(it, "")
+            number = int(value)
+            if number <= 0:
+                raise ValueError(f"{key} must be positive")
+            opts[flags[key]] = number
+        else:
+            positional.append(arg)
+    return positional, opts
+
+COMMAND_HELP = {
+    "pwd": "Print working directory",
+    "ls [path]": "List directory contents",
+    "cd <path>": "Change directory",
+    "get <remote> [local]": "Download file(s) from server (glob patterns allowed)",
+    "put <local> [remote]": "Upload file(s) to server (glob patterns allowed)",
+    "mkdir <dir>": "Create directory",
+    "stat <path>": "Show file/directory statistics",
+    "help": "Show this help message",
+    "exit": "Exit the client",
+    "--block-size N": f"get/put block size (default {DEFAULT_BLOCK_SIZE})",
+    "--max-requests N": f"get/put requests in flight (default {DEFAULT_MAX_REQUESTS})",
+}
+
+# Rendered once at import; cmd_help emits it with a single write
+HELP_TEXT = "Available commands:\n" + "".join(
+    f"  {cmd:<20} - {desc}\n" for cmd, desc in COMMAND_HELP.items()
+)
+
+def format_entry(name, attrs):
+    """Render one listing line with the mode and size the server sent"""
+    mode = stat.filemode(attrs.permissions) if attrs.permissions is not None else "?" * 10
+    size = attrs.size if attrs.size is not None else "?"
+    return f"{mode} {size:>10} {name}"
+
+def _resolve(future, result, exc):
+    if future.done():
+        return
+    if exc is not None:
+        future.set_exception(exc)
+    else:
+        future.set_result(result)
+
+# Line read still in progress on the stdin thread (kept across Ctrl+C)
+_pending_read = None
+
+async def ainput(prompt=""):
+    """
+    Read a line from stdin without blocking the event loop. Ctrl+C raises
+    KeyboardInterrupt here, as it did in the blocking input(); the read in
+    progress is kept and picked up by the next call.
+    """
+    global _pending_read
+    loop = asyncio.get_running_loop()
+    future = _pending_read
+    if future is not None and not future.done() and future.get_loop() is loop:
+        # input() is still waiting from an interrupted prompt; show it again
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+    else:
+        future = _pending_read = loop.create_future()
+        
+        def read():
+            try:
+                line = input(prompt)
+            except BaseException as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, line, None)
+        
+        # Daemon thread so an unanswered prompt never blocks interpreter exit
+        threading.Thread(target=read, daemon=True).start()
+    
+    interrupted = loop.create_future()
+    previous = signal.getsignal(signal.SIGINT)
+    try:
+        loop.add_signal_handler(signal.SIGINT, _resolve, interrupted, True, None)
+        watching = "loop"
+    except NotImplementedError:
+        # Windows loops lack add_signal_handler; a plain handler must wake
+        # the loop itself, as main.py does for its stop event
+        try:
+            signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(
+                _resolve, interrupted, True, None))
+            watching = "signal"
+        except ValueError:
+            watching = None  # not the main thread; Ctrl+C can't be caught
+    except RuntimeError:
+        watching = None  # not the main thread; Ctrl+C can't be caught
+    try:
+        await asyncio.wait({future, interrupted}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        if watching == "loop":
+            loop.remove_signal_handler(signal.SIGINT)
+        if watching:
+            signal.signal(signal.SIGINT, previous)
+    if not future.done():
+        raise KeyboardInterrupt
+    _pending_read = None
+    return future.result()
+
 class SFTPClient:
     def __init__(self, sftp):
         self.sftp = sftp
         self.current_dir = "/"
+        self._stat_cache = {}  # normalized path -> (attrs, monotonic time seen)
+        self._commands = {
+            "help": self.cmd_help,
+            "pwd": self.cmd_pwd,
+            "ls": self.cmd_ls,
+            "cd": self.cmd_cd,
+            "get": self.cmd_get,
+            "put": self.cmd_put,
+            "mkdir": self.cmd_mkdir,
+            "stat": self.cmd_stat,
+        }
     
     async def cmd_pwd(self, args):
         """Print working directory"""
@@ -25,44 +168,132 @@ class SFTPClient:
         """List directory contents"""
         path = args[0] if args else "."
         try:
-            entries = await self.sftp.listdir(path)
-            print(f"Contents of {path}:")
-            for entry in entries:
-                print(f"  {entry}")
+            # scandir streams READDIR batches and carries each entry's attrs,
+            # so size/mode are shown without a STAT round-trip per entry
+            lines = [f"Contents of {path}:\n"]
+            # Start over so entries from older listings don't pile up
+            self._stat_cache.clear()
+            now = time.monotonic()
+            async for entry in self.sftp.scandir(path):
+                attrs = entry.attrs
+                lines.append(f"  {format_entry(entry.filename, attrs)}\n")
+                # Listing attrs describe the entry itself (lstat); only cache
+                # those known not to be symlinks, so stat still follows links
+                if attrs.permissions is not None and not stat.S_ISLNK(attrs.permissions):
+                    self._stat_cache[posixpath.normpath(posixpath.join(path, entry.filename))] = (attrs, now)
+            # One write for the whole listing instead of a print per entry
+            sys.stdout.write("".join(lines))
         except Exception as e:
             print(f"ls failed: {e}")
     
+    def _cached_attrs(self, path):
+        """Return attrs from a recent listing, or None if absent or stale"""
+        key = posixpath.normpath(path)
+        hit = self._stat_cache.get(key)
+        if hit is None:
+            return None
+        attrs, seen = hit
+        if time.monotonic() - seen > STAT_CACHE_TTL:
+            del self._stat_cache[key]
+            return None
+        return attrs
+    
+    def _clamp_block_size(self, opts, limit_name):
+        """Cap block_size at the read/write length the server advertised"""
+        # Without limits@openssh.com the client only knows asyncssh's 16 KiB
+        # fallback, which says nothing about what the server will accept
+        if not getattr(self.sftp._handler, "_supports_limits", False):
+            return opts
+        limit = getattr(self.sftp.limits, limit_name)
+        if limit and opts["block_size"] > limit:
+            opts = dict(opts, block_size=limit)
+        return opts
+    
+    async def _transfer_many(self, transfer, name, verb, pairs, opts):
+        """Run several transfers concurrently over the single SFTP channel"""
+        # Matches from different directories can share a basename; running
+        # both would write the same destination concurrently
+        sources = {}
+        for src, dst in pairs:
+            if dst in sources:
+                print(f"{name} failed: {sources[dst]} and {src} both map to {dst}")
+                return
+            sources[dst] = src
+        limit = asyncio.Semaphore(MAX_PARALLEL_TRANSFERS)
+        
+        async def transfer_one(src, dst):
+            async with limit:
+                try:
+                    await transfer(src, dst, **opts)
+                    print(f"{verb}: {src} -> {dst}")
+                except Exception as e:
+                    print(f"{name} failed for {src}: {e}")
+        
+        await asyncio.gather(*(transfer_one(src, dst) for src, dst in pairs))
+    
     async def cmd_get(self, args):
         """Download file from server"""
+        try:
+            args, opts = parse_transfer_opts(args)
+        except ValueError:
+            print("get failed: --block-size and --max-requests expect positive integers")
+            return
         if not args:
-            print("Usage: get <remote_file> [local_file]")
+            print("Usage: get [--block-size N] [--max-requests N] <remote_file|pattern> [local_file|local_dir]")
             return
+        opts = self._clamp_block_size(opts, "max_read_len")
         
         remote_file = args[0]
+        if glob.has_magic(remote_file):
+            try:
+                files = await self.sftp.glob(remote_file)
+            except Exception as e:
+                print(f"get failed: {e}")
+                return
+            local_dir = args[1] if len(args) > 1 else "."
+            pairs = [(f, os.path.join(local_dir, posixpath.basename(f))) for f in files]
+            await self._transfer_many(self.sftp.get, "get", "Downloaded", pairs, opts)
+            return
+        
         local_file = args[1] if len(args) > 1 else os.path.basename(remote_file)
         
         try:
-            await self.sftp.get(remote_file, local_file)
+            await self.sftp.get(remote_file, local_file, **opts)
             print(f"Downloaded: {remote_file} -> {local_file}")
         except Exception as e:
             print(f"get failed: {e}")
     
     async def cmd_put(self, args):
         """Upload file to server"""
+        try:
+            args, opts = parse_transfer_opts(args)
+        except ValueError:
+            print("put failed: --block-size and --max-requests expect positive integers")
+            return
         if not args:
-            print("Usage: put <local_file> [remote_file]")
+            print("Usage: put [--block-size N] [--max-requests N] <local_file|pattern> [remote_file|remote_dir]")
             return
+        opts = self._clamp_block_size(opts, "max_write_len")
         
         local_file = args[0]
-        remote_file = args[1] if len(args) > 1 else os.path.basename(local_file)
-        
-        if not os.path.exists(local_file):
-            print(f"Local file not found: {local_file}")
+        self._stat_cache.clear()
+        if glob.has_magic(local_file):
+            files = glob.glob(local_file)
+            if not files:
+                print(f"No local files match: {local_file}")
+                return
+            remote_dir = args[1] if len(args) > 1 else "."
+            pairs = [(f, posixpath.join(remote_dir, os.path.basename(f))) for f in files]
+            await self._transfer_many(self.sftp.put, "put", "Uploaded", pairs, opts)
             return
         
+        remote_file = args[1] if len(args) > 1 else os.path.basename(local_file)
+        
         try:
-            await self.sftp.put(local_file, remote_file)
+            await self.sftp.put(local_file, remote_file, **opts)
             print(f"Uploaded: {local_file} -> {remote_file}")
+        except FileNotFoundError:
+            print(f"Local file not found: {local_file}")
         except Exception as e:
             print(f"put failed: {e}")
     
@@ -73,6 +304,7 @@ class SFTPClient:
             return
         
         directory = args[0]
+        self._stat_cache.clear()
         try:
             await self.sftp.mkdir(directory)
             print(f"Created directory: {directory}")
@@ -87,7 +319,9 @@ class SFTPClient:
         
         path = args[0]
         try:
-            attrs = await self.sftp.stat(path)
+            attrs = self._cached_attrs(path)
+            if attrs is None:
+                attrs = await self.sftp.stat(path)
             print(f"Statistics for {path}:")
             print(f"  Size: {attrs.size} bytes")
             print(f"  Mode: {oct(attrs.permissions) if attrs.permissions else 'N/A'}")
@@ -99,8 +333,12 @@ class SFTPClient:
         """Change directory"""
         path = args[0] if args else "/"
         try:
-            # Verify the directory exists
-            await self.sftp.listdir(path)
+            # One STAT proves the directory exists without listing it; always
+            # asked fresh, since the directory may have gone since the listing
+            attrs = await self.sftp.stat(path)
+            if not stat.S_ISDIR(attrs.permissions or 0):
+                print(f"cd failed: not a directory: {path}")
+                return
             self.current_dir = path
             print(f"Changed to directory: {path}")
         except Exception as e:
@@ -108,21 +346,7 @@ class SFTPClient:
     
     async def cmd_help(self, args):
         """Show available commands"""
-        commands = {
-            "pwd": "Print working directory",
-            "ls [path]": "List directory contents",
-            "cd <path>": "Change directory",
-            "get <remote> [local]": "Download file from server",
-            "put <local> [remote]": "Upload file to server", 
-            "mkdir <dir>": "Create directory",
-            "stat <path>": "Show file/directory statistics",
-            "help": "Show this help message",
-            "exit": "Exit the client"
-        }
-        
-        print("Available commands:")
-        for cmd, desc in commands.items():
-            print(f"  {cmd:<20} - {desc}")
+        sys.stdout.write(HELP_TEXT)
     
     async def run_interactive(self):
         """Run interactive command loop"""
@@ -135,7 +359,7 @@ class SFTPClient:
         while True:
             try:
                 # Command prompt
-                line = input(f"sftp:{self.current_dir}> ").strip()
+                line = (await ainput(f"sftp:{self.current_dir}> ")).strip()
                 if not line:
                     continue
                 
@@ -146,22 +370,10 @@ class SFTPClient:
                 if cmd == "exit":
                     print("Goodbye!")
                     break
-                elif cmd == "help":
-                    await self.cmd_help(args)
-                elif cmd == "pwd":
-                    await self.cmd_pwd(args)
-                elif cmd == "ls":
-                    await self.cmd_ls(args)
-                elif cmd == "cd":
-                    await self.cmd_cd(args)
-                elif cmd == "get":
-                    await self.cmd_get(args)
-                elif cmd == "put":
-                    await self.cmd_put(args)
-                elif cmd == "mkdir":
-                    await self.cmd_mkdir(args)
-                elif cmd == "stat":
-                    await self.cmd_stat(args)
+                
+                handler = self._commands.get(cmd)
+                if handler:
+                    await handler(args)
                 else:
                     print(f"Unknown command: {cmd}. Type 'help' for available commands.")
                     
@@ -184,6 +396,12 @@ async def main(host="127.0.0.1", port=2222, username="test", password="test"):
             username=username,
             password=password,
             known_hosts=KNOWN_HOSTS_FILE,
+            keepalive_interval=KEEPALIVE_INTERVAL,
+            compression_algs=None,
+            encryption_algs=ENCRYPTION_ALGS,
+            kex_algs=KEX_ALGS,
+            window=CHANNEL_WINDOW,
+            max_pktsize=CHANNEL_MAX_PKTSIZE,
         ) as conn:
             print("✅ Connected successfully!")
             
@@ -1,17 +1,27 @@
 #!/usr/bin/env python3
-import asyncio, asyncssh, os, struct, stat
+import asyncio, asyncssh, os, struct, stat, signal
 import logging, traceback
 from server.policy import authorize
 from server import policy
 
-# Basic logging setup
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
+# Basic logging setup, once at import; SFTP_LOG_LEVEL=DEBUG shows packet traces
+LOG_LEVEL_NAME = os.environ.get("SFTP_LOG_LEVEL", "INFO").upper()
+_log_level = logging.getLevelName(LOG_LEVEL_NAME)  # int for known names
+logging.basicConfig(level=_log_level if isinstance(_log_level, int) else logging.INFO,
+                    format="%(asctime)s %(levelname)s: %(message)s")
+# Per-packet tracing goes to DEBUG so the hot path doesn't write to stdout
+log = logging.getLogger("sftp")
+if not isinstance(_log_level, int):
+    log.warning("Unknown SFTP_LOG_LEVEL %r, using INFO", LOG_LEVEL_NAME)
 
 
 HOST_KEY_PATH = './ssh_host_ed25519_key'
 LISTEN_HOST, LISTEN_PORT = '', 2222
 SFTP_SUBSYSTEM_NAME = 'sftp'
 JAIL_ROOT = os.path.abspath('./sftp_root')
+# Channel flow control sized for 1 MiB SFTP blocks (uploads fill our window)
+CHANNEL_WINDOW = 4 * 1024 * 1024
+CHANNEL_MAX_PKTSIZE = 1024 * 1024
 
 # --- SFTP constants (subset for INIT/REALPATH/OPENDIR/READDIR/CLOSE) ---
 SSH_FXP_INIT, SSH_FXP_VERSION = 1, 2
@@ -35,6 +45,12 @@ SSH_FXP_FSTAT   = 8
 SSH_FXP_STAT    = 17
 SSH_FXP_ATTRS   = 105
 
+PACKET_NAMES = {
+    1: "INIT", 2: "VERSION", 3: "OPEN", 4: "CLOSE", 5: "READ", 6: "WRITE", 7: "LSTAT",
+    8: "FSTAT", 11: "OPENDIR", 12: "READDIR", 14: "MKDIR", 16: "REALPATH", 17: "STAT",
+    101: "STATUS", 102: "HANDLE", 103: "DATA", 104: "NAME", 105: "ATTRS"
+}
+
 
 def parse_attrs_ignore(buf, off):
     ATTR_SIZE, ATTR_UIDGID, ATTR_PERMISSIONS, ATTR_ACMODTIME, ATTR_EXTENDED = 0x1, 0x2, 0x4, 0x8, 0x80000000
@@ -66,15 +82,21 @@ def canon_sftp_path(path_bs: bytes) -> str:
 
 
 
-def p_u32(n): return struct.pack(">I", n & 0xffffffff)
-def p_u64(n): return struct.pack(">Q", n & 0xffffffffffffffff)
+# Precompiled formats: struct.pack(">I", ...) re-parses the format each call
+_U32 = struct.Struct(">I")
+_U64 = struct.Struct(">Q")
+
+def p_u32(n): return _U32.pack(n & 0xffffffff)
+def p_u64(n): return _U64.pack(n & 0xffffffffffffffff)
 def p_byte(b): return struct.pack("B", b)
-def p_str(bs): return p_u32(len(bs)) + bs
-def pack_pkt(ptype, payload): body = bytes([ptype]) + payload; return p_u32(len(body)) + body
+def p_str(bs): return _U32.pack(len(bs)) + bs
+def pack_pkt(ptype, payload): return b"".join((_U32.pack(len(payload) + 1), bytes((ptype,)), payload))
 
-def u32(b, off): return struct.unpack_from(">I", b, off)[0], off+4
-def u64(b, off): return struct.unpack_from(">Q", b, off)[0], off+8
-def ustr(b, off): ln, off = u32(b, off); return b[off:off+ln], off+ln
+def u32(b, off): return _U32.unpack_from(b, off)[0], off+4
+def u64(b, off): return _U64.unpack_from(b, off)[0], off+8
+# Copies the field out as bytes: packets arrive as memoryviews over the
+# receive buffer, and paths/handles are decoded and used as dict keys
+def ustr(b, off): ln, off = u32(b, off); return bytes(b[off:off+ln]), off+ln
 
 def sftp_attrs_from_stat(st):
     perms = stat.S_IFMT(st.st_mode) | (st.st_mode & 0o777)
@@ -104,9 +126,13 @@ def safe_join(jroot, path_bs):
     return full
 
 
+# Consumed bytes are dropped from the receive buffer once they exceed this
+RECV_COMPACT_THRESHOLD = 64 * 1024
+
 class SFTPSession(asyncssh.SSHServerSession):
     def __init__(self):
-        self.buf = b""
+        self.buf = bytearray()
+        self._off = 0  # start of the first unparsed byte in self.buf
         self.handles = Handles()
         self.initialized = False
         self._sftp_ok = False
@@ -148,14 +174,43 @@ class SFTPSession(asyncssh.SSHServerSession):
         if isinstance(data, str):                     # safety net
             data = data.encode('utf-8', 'surrogatepass')
 
-        self.buf += data
-        while len(self.buf) >= 4:
-            n, = struct.unpack(">I", self.buf[:4])
-            if len(self.buf) < 4 + n:
-                break
-            pkt = self.buf[4:4+n]
-            self.buf = self.buf[4+n:]
-            self._handle(pkt)
+        # Parse in place with a cursor; each packet is handed over as a
+        # zero-copy memoryview into the receive buffer
+        try:
+            self.buf.extend(data)
+        except BufferError:
+            self._unpin_buffer()
+            self.buf.extend(data)
+
+        mv = memoryview(self.buf)
+        try:
+            while len(self.buf) - self._off >= 4:
+                n = _U32.unpack_from(mv, self._off)[0]
+                start = self._off + 4
+                if len(self.buf) < start + n:
+                    break
+                pkt = mv[start:start+n]
+                self._off = start + n
+                self._handle(pkt)
+                pkt.release()
+        finally:
+            mv.release()
+
+        try:
+            if self._off == len(self.buf):
+                self.buf.clear()
+                self._off = 0
+            elif self._off > RECV_COMPACT_THRESHOLD:
+                del self.buf[:self._off]
+                self._off = 0
+        except BufferError:
+            self._unpin_buffer()
+
+    def _unpin_buffer(self):
+        """Continue on a copy of the unparsed bytes when a packet view that
+        outlived its handler (e.g. held by a traceback) blocks resizing"""
+        self.buf = bytearray(self.buf[self._off:])
+        self._off = 0
 
     def _send_status(self, req_id, code, msg=b""):
         self._chan.write(pack_pkt(
@@ -166,14 +221,15 @@ class SFTPSession(asyncssh.SSHServerSession):
     def _check_authorization(self, operation: str, path: str) -> bool:
         """Check if the current user is authorized for the operation on the given path"""
         if not self._username:
-            print(f"[AUTH] No authenticated user for {operation} on {path}")
+            log.debug("[AUTH] No authenticated user for %s on %s", operation, path)
             return False
         
         # Convert SFTP path to canonical form for authorization
         canonical_path = canon_sftp_path(path) if isinstance(path, bytes) else path
         authorized = authorize(self._username, operation, canonical_path)
         
-        print(f"[AUTH] User '{self._username}' {operation} '{canonical_path}': {'ALLOWED' if authorized else 'DENIED'}")
+        log.debug("[AUTH] User '%s' %s '%s': %s", self._username, operation, canonical_path,
+                  'ALLOWED' if authorized else 'DENIED')
         return authorized
 
     def _handle(self, pkt: bytes):
@@ -181,15 +237,7 @@ class SFTPSession(asyncssh.SSHServerSession):
         payload = pkt[1:]
 
         # debug every packet type
-        try:
-            name = {
-                1: "INIT", 2: "VERSION", 3: "OPEN", 4: "CLOSE", 5: "READ", 6: "WRITE", 7: "LSTAT",
-                8: "FSTAT", 11: "OPENDIR", 12: "READDIR", 14: "MKDIR", 16: "REALPATH", 17: "STAT",
-                101: "STATUS", 102: "HANDLE", 103: "DATA", 104: "NAME", 105: "ATTRS"
-            }.get(ptype, f"PTYPE_{ptype}")
-            print(f"[PKT] type={name} len={len(payload)}")
-        except Exception:
-            pass
+        log.debug("[PKT] type=%s len=%d", PACKET_NAMES.get(ptype, ptype), len(payload))
 
         # Expect INIT first; reply VERSION=3
         if not self.initialized:
@@ -215,7 +263,7 @@ class SFTPSession(asyncssh.SSHServerSession):
                 try:
                     full = safe_join(JAIL_ROOT, path)
                     # Debug every REALPATH, not just "."
-                    print(f"[REALPATH] request: {path!r} -> canon: {canon} -> full: {safe_join(JAIL_ROOT, path)}")
+                    log.debug("[REALPATH] request: %r -> canon: %s -> full: %s", path, canon, full)
 
                     st = os.stat(full)
                     attrs = sftp_attrs_from_stat(st)
@@ -247,7 +295,7 @@ class SFTPSession(asyncssh.SSHServerSession):
                     self._send_status(req_id, SSH_FX_NO_SUCH_FILE, b"no such file")
                     return
                 # optional debug
-                print(f"[{'LSTAT' if ptype == SSH_FXP_LSTAT else 'STAT'}] {path!r} -> {full}")
+                log.debug("[%s] %r -> %s", 'LSTAT' if ptype == SSH_FXP_LSTAT else 'STAT', path, full)
                 self._chan.write(pack_pkt(SSH_FXP_ATTRS, p_u32(req_id) + sftp_attrs_from_stat(st)))
 
             elif ptype == SSH_FXP_OPENDIR:
@@ -301,8 +349,8 @@ class SFTPSession(asyncssh.SSHServerSession):
                 
                 try:
                     full = safe_join(JAIL_ROOT, path)  # map "/demo" -> <jail>\demo
-                    # Debug (optional): print to console so you can see the resolved path
-                    print(f"[MKDIR] request: {path!r} -> full: {full}")
+                    # Debug (optional): log the resolved path
+                    log.debug("[MKDIR] request: %r -> full: %s", path, full)
                     os.makedirs(full, exist_ok=False)  # create exactly one dir
                 except FileExistsError:
                     self._send_status(req_id, SSH_FX_FAILURE, b"already exists")
@@ -317,7 +365,7 @@ class SFTPSession(asyncssh.SSHServerSession):
                 else:
                     self._send_status(req_id, SSH_FX_OK, b"OK")
             elif ptype == SSH_FXP_OPEN:
-                print("[FXP_OPEN] request started")
+                log.debug("[FXP_OPEN] request started")
                 filename, off = ustr(payload, off)
                 pflags, off = u32(payload, off)
                 off = parse_attrs_ignore(payload, off)  # ignore attrs
@@ -337,7 +385,7 @@ class SFTPSession(asyncssh.SSHServerSession):
 
                 full = safe_join(JAIL_ROOT, filename)
 
-                print(f"[FXP_OPEN] request: {filename!r} -> full: {full}")
+                log.debug("[FXP_OPEN] request: %r -> full: %s", filename, full)
                 # Map SFTP pflags to Python open() modes
                 # Default to read-only; adjust based on flags
                 mode = "rb"
@@ -365,7 +413,9 @@ class SFTPSession(asyncssh.SSHServerSession):
             elif ptype == SSH_FXP_WRITE:
                 handle_bs, off = ustr(payload, off)
                 offset, off = u64(payload, off)
-                data, off = ustr(payload, off)
+                ln, off = u32(payload, off)
+                data = payload[off:off+ln]  # written straight from the receive buffer
+                off += ln
 
                 f = self.handles.get(handle_bs)
                 if not f or not hasattr(f, "write"):
@@ -415,10 +465,10 @@ class SFTPSession(asyncssh.SSHServerSession):
 
 
 # --- Password auth implemented on the server class (no keyword args needed) ---
-def validate_user_password(username, password):
-    # Use the real authentication system from auth.py
-    from server.auth import authenticate
-    return authenticate(username, password)
+async def validate_user_password(username, password):
+    # Use the real authentication system from auth.py; scrypt runs off-loop
+    from server.auth import authenticate_async
+    return await authenticate_async(username, password)
 
 class Server(asyncssh.SSHServer):
     def __init__(self):
@@ -431,8 +481,8 @@ class Server(asyncssh.SSHServer):
     def password_auth_supported(self):
         return True
 
-    def validate_password(self, username, password):
-        is_valid = validate_user_password(username, password)
+    async def validate_password(self, username, password):
+        is_valid = await validate_user_password(username, password)
         if is_valid:
             self._authenticated_username = username
         return is_valid
@@ -447,16 +497,40 @@ async def main():
     print("Initializing policy engine...")
     policy.warmup()
     print(f"Jail root: {JAIL_ROOT}")
-    await asyncssh.listen(
+    # Parse the host key once up front; a missing/bad key fails here
+    host_key = asyncssh.read_private_key(HOST_KEY_PATH)
+    server = await asyncssh.listen(
         LISTEN_HOST, LISTEN_PORT,
-        server_host_keys=[HOST_KEY_PATH],  # server identity key
-        server_factory=Server              # our auth & session handler
+        server_host_keys=[host_key],       # server identity key
+        server_factory=Server,             # our auth & session handler
+        window=CHANNEL_WINDOW,
+        max_pktsize=CHANNEL_MAX_PKTSIZE,
     )
     print(f"SFTP listening on {LISTEN_HOST or '0.0.0.0'}:{LISTEN_PORT} (subsystem '{SFTP_SUBSYSTEM_NAME}')")
-    await asyncio.Event().wait()
+
+    # Sleep until SIGINT/SIGTERM, then stop accepting and close cleanly
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: no loop signal support, so hand the signal over from
+            # the C-level handler instead of polling for KeyboardInterrupt
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+    await stop.wait()
+    print("Shutting down SFTP server...")
+    server.close()
+    await server.wait_closed()
 
 def main_entry():
     """Entry point for console script"""
+    # uvloop is optional; it lowers per-event overhead over the stock loop
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, SystemExit):
@@ -2,7 +2,9 @@
 Handles password verification using secure hashes
 Loads static user data from data/users.json.
 """
-import base64, hashlib, secrets, json, os
+import asyncio, base64, hashlib, secrets, json, os, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "users.json")
 
@@ -18,48 +20,166 @@ def _verify_password(password, salt_b64, hash_b64, n=2**14, r=8, p=1, dklen=64):
     except Exception:
         return False
 
-# Simple in-memory lockout tracking
-_FAILED_ATTEMPTS = {}
-MAX_FAILED_ATTEMPTS = 5
-LOCKOUT_SECONDS = 60
-import time
+# users.json indexed by username; "key" is the (mtime_ns, size) it was read at
+_USERS_CACHE = {"key": None, "by_user": {}}
 
-def authenticate(username, password):
-    # Lockout check
-    info = _FAILED_ATTEMPTS.get(username)
-    if info and time.time() < info.get("until", 0):
-        return False
+def _load_users():
+    """
+    Return users keyed by username, re-reading users.json only when it
+    changes. Returns None if the file is missing; the stat doubles as the
+    existence check.
+    """
+    try:
+        st = os.stat(DATA_PATH)
+    except OSError:
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    if key != _USERS_CACHE["key"]:
+        with open(DATA_PATH, "r", encoding="utf-8") as f:
+            users = json.load(f)
+        by_user = {}
+        for u in users:
+            by_user.setdefault(u.get("username"), u)
+        _USERS_CACHE["by_user"] = by_user
+        _USERS_CACHE["key"] = key
+    return _USERS_CACHE["by_user"]
 
-    if not os.path.isfile(DATA_PATH):
-        return False
+# Simple in-memory lockout tracking, ordered by most recent failure
+_FAILED_ATTEMPTS = OrderedDict()
+# Active lockouts (username -> until), kept apart from the failure counts so
+# that bounding the count table can never lift a lockout
+_LOCKED_UNTIL = {}
+MAX_FAILED_ATTEMPTS = 5
+LOCKOUT_SECONDS = 60
+# Bound the table so probing many usernames can't grow it forever
+MAX_TRACKED_USERS = 10000
+_GC_INTERVAL = 300
+_LAST_GC = 0.0
 
-    with open(DATA_PATH, "r", encoding="utf-8") as f:
-        users = json.load(f)
+def _gc_failed_attempts(now):
+    """Forget idle, never-locked usernames and expired lockouts; runs at most
+    once per _GC_INTERVAL"""
+    global _LAST_GC
+    if now - _LAST_GC < _GC_INTERVAL:
+        return
+    _LAST_GC = now
+    stale = [
+        u for u, i in _FAILED_ATTEMPTS.items()
+        if i["count"] < MAX_FAILED_ATTEMPTS and now - i.get("last", 0) > _GC_INTERVAL
+    ]
+    for u in stale:
+        del _FAILED_ATTEMPTS[u]
+    expired = [u for u, until in _LOCKED_UNTIL.items() if now >= until]
+    for u in expired:
+        del _LOCKED_UNTIL[u]
 
-    user = next((u for u in users if u.get("username") == username), None)
+def _is_locked_out(username, now):
+    _gc_failed_attempts(now)
+    return now < _LOCKED_UNTIL.get(username, 0)
 
-    ok = False
-    if user:
-        ok = _verify_password(
-            password,
-            user["salt"],
-            user["password_hash"],
-            n=user.get("n", 2**14),
-            r=user.get("r", 8),
-            p=user.get("p", 1),
-            dklen=user.get("dklen", 64)
-        )
+def _verify_user(user, password):
+    if not user:
+        return False
+    return _verify_password(
+        password,
+        user["salt"],
+        user["password_hash"],
+        n=user.get("n", 2**14),
+        r=user.get("r", 8),
+        p=user.get("p", 1),
+        dklen=user.get("dklen", 64)
+    )
 
+def _record_result(username, ok, now):
     if ok:
         _FAILED_ATTEMPTS.pop(username, None)
+        _LOCKED_UNTIL.pop(username, None)
         return True
 
-    # Failed attempt
-    info = _FAILED_ATTEMPTS.get(username, {"count": 0, "until": 0})
+    # Failed attempt; re-insert so the dict stays ordered by last failure
+    info = _FAILED_ATTEMPTS.pop(username, None) or {"count": 0}
     info["count"] += 1
+    info["last"] = now
 
     if info["count"] >= MAX_FAILED_ATTEMPTS:
-        info["until"] = time.time() + LOCKOUT_SECONDS
+        _LOCKED_UNTIL[username] = now + LOCKOUT_SECONDS
 
     _FAILED_ATTEMPTS[username] = info
+    # Only failure counts are evicted; active lockouts live in _LOCKED_UNTIL
+    while len(_FAILED_ATTEMPTS) > MAX_TRACKED_USERS:
+        _FAILED_ATTEMPTS.popitem(last=False)
     return False
+
+def authenticate(username, password):
+    now = time.time()
+    if _is_locked_out(username, now):
+        return False
+
+    users = _load_users()
+    if users is None:
+        return False
+
+    user = users.get(username)
+    return _record_result(username, _verify_user(user, password), now)
+
+# hashlib.scrypt releases the GIL, so one worker per core verifies in parallel
+_SCRYPT_WORKERS = os.cpu_count() or 1
+_SCRYPT_POOL = ThreadPoolExecutor(max_workers=_SCRYPT_WORKERS, thread_name_prefix="scrypt")
+# Verifications queued or running; attempts beyond the cap are refused rather
+# than piling unbounded scrypt work onto the pool
+MAX_PENDING_VERIFICATIONS = max(16, 4 * _SCRYPT_WORKERS)
+_PENDING = 0
+# username -> attempts currently being verified
+_IN_FLIGHT = {}
+
+def _attempts_left(username):
+    """Failures this user may still make before (re)locking"""
+    info = _FAILED_ATTEMPTS.get(username)
+    count = info["count"] if info else 0
+    # After a lockout expires the count is kept, so one more try is allowed
+    return max(1, MAX_FAILED_ATTEMPTS - count)
+
+async def authenticate_async(username, password):
+    """
+    Same as authenticate(), but the scrypt check runs on a worker thread so
+    the event loop keeps serving other connections meanwhile. Lockout
+    bookkeeping stays on the loop thread; attempts still being verified count
+    against the lockout limit, so concurrent guesses can't run past it.
+    """
+    global _PENDING
+    now = time.time()
+    if _is_locked_out(username, now):
+        return False
+
+    users = _load_users()
+    if users is None:
+        return False
+
+    user = users.get(username)
+    if user is None:
+        # Nothing to verify; no need to go through the pool
+        return _record_result(username, False, now)
+
+    in_flight = _IN_FLIGHT.get(username, 0)
+    if in_flight >= _attempts_left(username) or _PENDING >= MAX_PENDING_VERIFICATIONS:
+        return False
+
+    # Reserve the attempt before yielding to the loop
+    _IN_FLIGHT[username] = in_flight + 1
+    _PENDING += 1
+    try:
+        loop = asyncio.get_running_loop()
+        ok = await loop.run_in_executor(_SCRYPT_POOL, _verify_user, user, password)
+    finally:
+        _PENDING -= 1
+        left = _IN_FLIGHT[username] - 1
+        if left:
+            _IN_FLIGHT[username] = left
+        else:
+            del _IN_FLIGHT[username]
+
+    # Other attempts may have locked the account while this one was verified
+    now = time.time()
+    if _is_locked_out(username, now):
+        return False
+    return _record_result(username, ok, now)
@@ -2,90 +2,171 @@
 Implements authorization models (DAC, MAC, RBAC) and auditing.
 Combines all three access control models for comprehensive security.
 """
-import json, os, time, csv
+import atexit, csv, json, os, time, threading
 from typing import Dict, List, Optional, Tuple
 
+# orjson is optional; both encoders emit the same compact UTF-8 line. Note
+# this differs from the old json.dumps() default (", "/": " separators and
+# \uXXXX escapes); readers that parse the JSON see the same records
+try:
+    import orjson
+
+    def _encode_record(record: Dict) -> bytes:
+        return orjson.dumps(record) + b"\n"
+except ImportError:
+    def _encode_record(record: Dict) -> bytes:
+        return (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
+# Resolved once at import rather than joined on every load
+USERS_FILE = os.path.join(DATA_DIR, "users.json")
+USER_ROLES_FILE = os.path.join(DATA_DIR, "user_roles.json")
+ROLE_PERMS_FILE = os.path.join(DATA_DIR, "role_perms.csv")
+DAC_OWNERS_FILE = os.path.join(DATA_DIR, "dac_owners.csv")
+MAC_LABELS_FILE = os.path.join(DATA_DIR, "mac_labels.json")
 AUDIT_LOG = os.path.join(os.path.dirname(__file__), "..", "audit.jsonl")
 
-# Cache for loaded data to avoid repeated file I/O
+# Audit log stays open between records; reopened if AUDIT_LOG is repointed
+# or the file on disk is no longer the one we hold (rotated or deleted)
+_audit_fp = None
+_audit_path = None
+_audit_id = None  # (st_dev, st_ino) of the open file
+_audit_lock = threading.Lock()
+
+# Cache for loaded data to avoid repeated file I/O. Each entry is stored next
+# to the (mtime_ns, size) of its source file so edits are picked up on the
+# next call without a restart.
 _data_cache = {}
 
+def _file_key(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) identifying the current file contents"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _cached_load(name: str, path: str, parse):
+    """Return parsed data for a policy file, re-parsing only when it changed"""
+    key = _file_key(path)  # None if missing; parse() then returns the default
+    stat_key = name + '_stat_key'
+    if name not in _data_cache or _data_cache.get(stat_key) != key:
+        _data_cache[name] = parse(path)
+        _data_cache[stat_key] = key
+    return _data_cache[name]
+
+def _derived(name: str, sources: Tuple[str, ...], build):
+    """Cache data computed from loaded files, rebuilt whenever a source reloads"""
+    key = tuple(_data_cache.get(source + '_stat_key') for source in sources)
+    if name not in _data_cache or _data_cache.get(name + '_key') != key:
+        _data_cache[name] = build()
+        _data_cache[name + '_key'] = key
+    return _data_cache[name]
+
+def _read_json(path: str, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+def _read_csv_rows(path: str, columns: Tuple[str, ...]) -> List[Tuple[str, ...]]:
+    """
+    Return the named columns of each row of a CSV file as tuples, which
+    avoids csv.DictReader's per-row dict. Rows too short to hold every
+    column are skipped; a header missing a column yields no rows.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return []
+        try:
+            idx = [header.index(column) for column in columns]
+        except ValueError:
+            return []
+        width = max(idx) + 1
+        return [tuple(row[i] for i in idx) for row in reader if len(row) >= width]
+
+def _parse_role_permissions(path: str) -> Dict[str, Dict[str, bool]]:
+    perms = {}
+    try:
+        for role, operation, allowed in _read_csv_rows(path, ('role', 'operation', 'allowed')):
+            try:
+                flag = bool(int(allowed))
+            except ValueError:
+                continue  # malformed flag; skip the row
+            perms.setdefault(role, {})[operation] = flag
+    except (FileNotFoundError, csv.Error):
+        pass
+    return perms
+
+def _parse_dac_owners(path: str) -> Dict[str, Tuple[str, str]]:
+    owners = {}
+    try:
+        for entry_path, owner, permissions in _read_csv_rows(path, ('path', 'owner', 'permissions')):
+            owners[entry_path] = (owner, permissions)
+    except (FileNotFoundError, csv.Error):
+        pass
+    return owners
+
 def _load_users() -> List[Dict]:
     """Load user data including clearance levels"""
-    if 'users' not in _data_cache:
-        users_file = os.path.join(DATA_DIR, "users.json")
-        try:
-            with open(users_file, "r", encoding="utf-8") as f:
-                _data_cache['users'] = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            _data_cache['users'] = []
-    return _data_cache['users']
+    return _cached_load('users', USERS_FILE, lambda path: _read_json(path, []))
 
 def _load_user_roles() -> Dict[str, List[str]]:
     """Load user-role mappings"""
-    if 'user_roles' not in _data_cache:
-        roles_file = os.path.join(DATA_DIR, "user_roles.json")
-        try:
-            with open(roles_file, "r", encoding="utf-8") as f:
-                _data_cache['user_roles'] = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            _data_cache['user_roles'] = {}
-    return _data_cache['user_roles']
+    return _cached_load('user_roles', USER_ROLES_FILE, lambda path: _read_json(path, {}))
 
 def _load_role_permissions() -> Dict[str, Dict[str, bool]]:
     """Load role-permission mappings"""
-    if 'role_perms' not in _data_cache:
-        perms_file = os.path.join(DATA_DIR, "role_perms.csv")
-        perms = {}
-        try:
-            with open(perms_file, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    role = row['role']
-                    operation = row['operation']
-                    allowed = bool(int(row['allowed']))
-                    if role not in perms:
-                        perms[role] = {}
-                    perms[role][operation] = allowed
-        except (FileNotFoundError, csv.Error):
-            pass
-        _data_cache['role_perms'] = perms
-    return _data_cache['role_perms']
+    return _cached_load('role_perms', ROLE_PERMS_FILE, _parse_role_permissions)
 
 def _load_dac_owners() -> Dict[str, Tuple[str, str]]:
     """Load DAC ownership data"""
-    if 'dac_owners' not in _data_cache:
-        owners_file = os.path.join(DATA_DIR, "dac_owners.csv")
-        owners = {}
-        try:
-            with open(owners_file, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    owners[row['path']] = (row['owner'], row['permissions'])
-        except (FileNotFoundError, csv.Error):
-            pass
-        _data_cache['dac_owners'] = owners
-    return _data_cache['dac_owners']
+    return _cached_load('dac_owners', DAC_OWNERS_FILE, _parse_dac_owners)
 
 def _load_mac_labels() -> Dict:
     """Load MAC security labels and hierarchy"""
-    if 'mac_labels' not in _data_cache:
-        labels_file = os.path.join(DATA_DIR, "mac_labels.json")
-        try:
-            with open(labels_file, "r", encoding="utf-8") as f:
-                _data_cache['mac_labels'] = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            _data_cache['mac_labels'] = {"paths": {}, "clearance_hierarchy": {}}
-    return _data_cache['mac_labels']
-
-def _get_user_clearance(username: str) -> str:
-    """Get user's security clearance level"""
+    return _cached_load(
+        'mac_labels', MAC_LABELS_FILE,
+        lambda path: _read_json(path, {"paths": {}, "clearance_hierarchy": {}})
+    )
+
+def _user_levels(mac_data: Dict) -> Dict[str, Tuple[str, int]]:
+    """Map username -> (clearance, hierarchy level), resolved once per file load"""
     users = _load_users()
-    user = next((u for u in users if u.get("username") == username), None)
-    return user.get("clearance", "unclassified") if user else "unclassified"
+    hierarchy = mac_data["clearance_hierarchy"]
+    
+    def build():
+        levels = {}
+        for u in users:
+            clearance = u.get("clearance", "unclassified")
+            levels.setdefault(u.get("username"), (clearance, hierarchy.get(clearance, 0)))
+        return levels
+    
+    return _derived('user_levels', ('users', 'mac_labels'), build)
+
+def _path_levels(mac_data: Dict) -> Dict[str, Tuple[str, int]]:
+    """Map labelled path -> (label, hierarchy level), resolved once per file load"""
+    hierarchy = mac_data["clearance_hierarchy"]
+    return _derived(
+        'mac_paths_level', ('mac_labels',),
+        lambda: {p: (label, hierarchy.get(label, 0)) for p, label in mac_data["paths"].items()}
+    )
+
+def _sorted_prefixes(paths) -> List[Tuple[str, str, str]]:
+    """Return (clean, clean + '/', original) for each path, longest first"""
+    entries = []
+    for path in paths:
+        clean = path.rstrip('/') or '/'
+        entries.append((clean, clean + '/', path))
+    # Stable sort keeps dict order among equal lengths, like the old scan
+    entries.sort(key=lambda e: len(e[0]), reverse=True)
+    return entries
 
-def _find_best_matching_path(target_path: str, available_paths: Dict) -> Optional[str]:
+def _find_best_matching_path(target_path: str, available_paths: Dict,
+                             sorted_paths: Optional[List[Tuple[str, str, str]]] = None) -> Optional[str]:
     """Find the most specific matching path for authorization"""
     target_path = target_path.rstrip('/')
     if not target_path:
@@ -95,32 +176,75 @@ def _find_best_matching_path(target_path: str, available_paths: Dict) -> Optiona
     if target_path in available_paths:
         return target_path
     
-    # Find the longest matching parent path
-    best_match = None
-    best_length = -1
+    # The first parent in longest-first order is the most specific one
+    if sorted_paths is None:
+        sorted_paths = _sorted_prefixes(available_paths)
+    for clean, prefix, path in sorted_paths:
+        if target_path == clean or target_path.startswith(prefix):
+            return path
     
-    for path in available_paths.keys():
-        path_clean = path.rstrip('/')
-        if not path_clean:
-            path_clean = '/'
-            
-        # Check if this path is a parent of target_path
-        if target_path == path_clean or target_path.startswith(path_clean + '/'):
-            if len(path_clean) > best_length:
-                best_length = len(path_clean)
-                best_match = path
-                
     # If no parent found, use root if available
-    if best_match is None and '/' in available_paths:
-        best_match = '/'
-        
-    return best_match
+    return '/' if '/' in available_paths else None
+
+def _rbac_index(user_roles: Dict[str, List[str]], role_perms: Dict[str, Dict[str, bool]]
+                ) -> Tuple[Dict[str, frozenset], Dict[str, frozenset]]:
+    """Allowed operations per role and per user, compiled once per file load"""
+    def build():
+        role_allowed = {
+            role: frozenset(op for op, ok in ops.items() if ok)
+            for role, ops in role_perms.items()
+        }
+        user_allowed = {
+            user: frozenset().union(*(role_allowed.get(role, frozenset()) for role in roles))
+            for user, roles in user_roles.items()
+        }
+        return role_allowed, user_allowed
+    
+    return _derived('rbac_index', ('user_roles', 'role_perms'), build)
+
+# Resolved paths remembered per file load; an SFTP session authorizes the
+# same path repeatedly (stat, open, read...). Bounded because paths come
+# from clients.
+_MATCH_MEMO_SIZE = 1024
+
+def _match_path(name: str, source: str, path: str, available_paths: Dict) -> Optional[str]:
+    """Memoized _find_best_matching_path, reset whenever `source` reloads"""
+    memo = _derived(name + '_matches', (source,), dict)
+    try:
+        return memo[path]
+    except KeyError:
+        pass
+    sorted_paths = _derived(name + '_sorted', (source,), lambda: _sorted_prefixes(available_paths))
+    match = _find_best_matching_path(path, available_paths, sorted_paths)
+    if len(memo) >= _MATCH_MEMO_SIZE:
+        memo.clear()
+    memo[path] = match
+    return match
+
+# DAC permission bits; the execute bit stands in for delete
+_DAC_READ, _DAC_WRITE, _DAC_DELETE = 0x1, 0x2, 0x4
+_DAC_OP_BITS = {
+    'read': _DAC_READ, 'stat': _DAC_READ, 'realpath': _DAC_READ,
+    'opendir': _DAC_READ, 'readdir': _DAC_READ,
+    'write': _DAC_WRITE, 'create': _DAC_WRITE, 'mkdir': _DAC_WRITE,
+    'delete': _DAC_DELETE,
+}
+_DAC_GRANT_REASONS = {
+    _DAC_READ: "read permission granted",
+    _DAC_WRITE: "write permission granted",
+    _DAC_DELETE: "delete permission granted",
+}
+
+def _dac_perm_mask(perms: str) -> int:
+    """Convert an 'rwx'-style permission string into DAC permission bits"""
+    return ((_DAC_READ if 'r' in perms else 0)
+            | (_DAC_WRITE if 'w' in perms else 0)
+            | (_DAC_DELETE if 'x' in perms else 0))
 
 def _check_dac(user: str, op: str, path: str) -> Tuple[bool, str]:
     """Discretionary Access Control - check file ownership and permissions"""
     owners = _load_dac_owners()
-    
-    matching_path = _find_best_matching_path(path, owners)
+    matching_path = _match_path('dac_owners', 'dac_owners', path, owners)
     if not matching_path:
         return False, "no DAC entry found"
     
@@ -131,31 +255,28 @@ def _check_dac(user: str, op: str, path: str) -> Tuple[bool, str]:
         return True, "owner access"
     
     # Check permissions for non-owners (simplified - treating as "other" permissions)
-    if op in ['read', 'stat', 'realpath', 'opendir', 'readdir'] and 'r' in perms:
-        return True, "read permission granted"
-    elif op in ['write', 'create', 'mkdir'] and 'w' in perms:
-        return True, "write permission granted"
-    elif op == 'delete' and 'x' in perms:  # Using execute bit for delete
-        return True, "delete permission granted"
+    need = _DAC_OP_BITS.get(op, 0)
+    masks = _derived('dac_owner_masks', ('dac_owners',),
+                     lambda: {p: _dac_perm_mask(entry[1]) for p, entry in owners.items()})
+    if masks[matching_path] & need:
+        return True, _DAC_GRANT_REASONS[need]
     
     return False, f"insufficient DAC permissions ({perms}) for operation {op}"
 
 def _check_mac(user: str, op: str, path: str) -> Tuple[bool, str]:
     """Mandatory Access Control - check security labels and clearance"""
     mac_data = _load_mac_labels()
-    user_clearance = _get_user_clearance(user)
+    hierarchy = mac_data["clearance_hierarchy"]
+    # Unknown users and unlabelled paths are treated as unclassified
+    unclassified = ("unclassified", hierarchy.get("unclassified", 0))
+    user_clearance, user_level = _user_levels(mac_data).get(user, unclassified)
     
     # Find the security label for this path
-    matching_path = _find_best_matching_path(path, mac_data["paths"])
+    matching_path = _match_path('mac_paths', 'mac_labels', path, mac_data["paths"])
     if not matching_path:
-        # Default to unclassified if no label found
-        file_label = "unclassified"
+        file_label, file_level = unclassified
     else:
-        file_label = mac_data["paths"][matching_path]
-    
-    hierarchy = mac_data["clearance_hierarchy"]
-    user_level = hierarchy.get(user_clearance, 0)
-    file_level = hierarchy.get(file_label, 0)
+        file_label, file_level = _path_levels(mac_data)[matching_path]
     
     # Bell-LaPadula model: no read up, no write down
     if op in ['read', 'stat', 'realpath', 'opendir', 'readdir']:
@@ -186,67 +307,147 @@ def _check_rbac(user: str, op: str, path: str) -> Tuple[bool, str]:
     if not user_role_list:
         return False, "user has empty role list"
     
-    # Check if any of the user's roles allow this operation
-    allowed_roles = []
-    denied_roles = []
+    role_allowed, user_allowed = _rbac_index(user_roles, role_perms)
     
-    for role in user_role_list:
-        if role in role_perms and op in role_perms[role]:
-            if role_perms[role][op]:
-                allowed_roles.append(role)
-            else:
-                denied_roles.append(role)
-        else:
-            denied_roles.append(f"{role}(no-perm)")
-    
-    if allowed_roles:
+    # One set probe decides; the role lists are only built for the reason
+    if op in user_allowed[user]:
+        allowed_roles = [role for role in user_role_list if op in role_allowed.get(role, ())]
         return True, f"RBAC allowed by roles: {allowed_roles}"
-    else:
-        return False, f"RBAC denied - checked roles: {denied_roles}"
+    
+    denied_roles = [
+        role if op in role_perms.get(role, {}) else f"{role}(no-perm)"
+        for role in user_role_list
+    ]
+    return False, f"RBAC denied - checked roles: {denied_roles}"
 
-def authorize(user: str, op: str, path: str) -> bool:
-    """
-    Perform comprehensive authorization using DAC, MAC, and RBAC.
-    All three models must allow access for the operation to be authorized.
-    """
+def _evaluate(user: str, op: str, path: str) -> Tuple[str, bool, str]:
+    """Run the three models for one request; returns (path, allowed, reason)"""
     # Normalize path
     path = path.strip()
     if not path or path == '.':
         path = '/'
     
-    # Check all three access control models
-    dac_allowed, dac_reason = _check_dac(user, op, path)
-    mac_allowed, mac_reason = _check_mac(user, op, path)
-    rbac_allowed, rbac_reason = _check_rbac(user, op, path)
+    # Run the cheapest model first (RBAC is a dict lookup, DAC/MAC scan
+    # paths) and stop at the first denial, since any one denial decides
+    results = {}
+    for name, check in (("RBAC", _check_rbac), ("DAC", _check_dac), ("MAC", _check_mac)):
+        results[name] = check(user, op, path)
+        if not results[name][0]:
+            break
     
     # All models must allow access
-    allowed = dac_allowed and mac_allowed and rbac_allowed
+    allowed = len(results) == 3 and all(ok for ok, _ in results.values())
     
     # Construct detailed reason
-    reasons = [
-        f"DAC: {'✓' if dac_allowed else '✗'} {dac_reason}",
-        f"MAC: {'✓' if mac_allowed else '✗'} {mac_reason}",
-        f"RBAC: {'✓' if rbac_allowed else '✗'} {rbac_reason}"
-    ]
+    reasons = []
+    for name in ("DAC", "MAC", "RBAC"):
+        if name in results:
+            ok, reason = results[name]
+            reasons.append(f"{name}: {'✓' if ok else '✗'} {reason}")
+        else:
+            reasons.append(f"{name}: - skipped")
     
     final_reason = f"Authorization {'GRANTED' if allowed else 'DENIED'} - " + " | ".join(reasons)
-    
-    _audit(user, op, path, allowed, final_reason)
+    return path, allowed, final_reason
+
+def authorize(user: str, op: str, path: str) -> bool:
+    """
+    Perform comprehensive authorization using DAC, MAC, and RBAC.
+    All three models must allow access for the operation to be authorized.
+    """
+    path, allowed, reason = _evaluate(user, op, path)
+    _audit(user, op, path, allowed, reason)
     return allowed
 
+def authorize_many(items, quiet: bool = False) -> List[Tuple[bool, str]]:
+    """
+    Authorize a batch of (user, op, path) requests, returning an
+    (allowed, reason) pair per item. Repeated requests are evaluated once.
+    With quiet=True no audit records are written (for test batches).
+    """
+    decisions = {}
+    out = []
+    for user, op, path in items:
+        key = (user, op, path)
+        if key not in decisions:
+            decisions[key] = _evaluate(user, op, path)
+        norm_path, allowed, reason = decisions[key]
+        if not quiet:
+            _audit(user, op, norm_path, allowed, reason)
+        out.append((allowed, reason))
+    return out
+
+# (epoch second, formatted) — replaced as one tuple so readers never see a
+# second paired with another second's string
+_ts_cache = (0, "")
+
+def _timestamp() -> str:
+    """UTC audit timestamp, formatted at most once per wall-clock second"""
+    global _ts_cache
+    now = int(time.time())
+    if _ts_cache[0] != now:
+        _ts_cache = (now, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now)))
+    return _ts_cache[1]
+
+def _encode_audit_line(record: Dict) -> bytes:
+    """Encode a record, falling back to ASCII-escaped JSON for text the UTF-8
+    encoders reject (e.g. lone surrogates from undecodable paths)"""
+    try:
+        return _encode_record(record)
+    except (TypeError, ValueError):
+        return (json.dumps(record, separators=(",", ":")) + "\n").encode("ascii")
+
+def _audit_file_current() -> bool:
+    """True if the open handle still refers to the file at AUDIT_LOG"""
+    if _audit_fp is None or _audit_path != AUDIT_LOG:
+        return False
+    try:
+        st = os.stat(AUDIT_LOG)
+    except FileNotFoundError:
+        return False
+    return (st.st_dev, st.st_ino) == _audit_id
+
 def _audit(user, op, path, allowed, reason):
     """Log access attempts for security auditing"""
+    global _audit_fp, _audit_path, _audit_id
     record = {
-        "ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "ts": _timestamp(),
         "user": user, "op": op, "path": path,
         "allowed": allowed, "reason": reason
     }
-    try:
-        os.makedirs(os.path.dirname(AUDIT_LOG), exist_ok=True)
-        with open(AUDIT_LOG, "a", encoding="utf-8") as f:
-            f.write(json.dumps(record) + "\n")
-    except Exception as e:
-        print(f"Failed to write audit log: {e}")
+    with _audit_lock:
+        try:
+            line = _encode_audit_line(record)
+            if not _audit_file_current():
+                if _audit_fp is not None:
+                    _audit_fp.close()
+                    _audit_fp = None
+                os.makedirs(os.path.dirname(AUDIT_LOG), exist_ok=True)
+                # Unbuffered binary: one write() per record, no open/close per call
+                _audit_fp = open(AUDIT_LOG, "ab", buffering=0)
+                _audit_path = AUDIT_LOG
+                st = os.fstat(_audit_fp.fileno())
+                _audit_id = (st.st_dev, st.st_ino)
+            _audit_fp.write(line)
+        except Exception as e:
+            if _audit_fp is not None:
+                try:
+                    _audit_fp.close()
+                except OSError:
+                    pass
+            _audit_fp = None
+            print(f"Failed to write audit log: {e}")
+
+def _reopen_audit():
+    """Close the open audit handle so the next record reopens AUDIT_LOG"""
+    global _audit_fp, _audit_path
+    with _audit_lock:
+        if _audit_fp is not None:
+            _audit_fp.close()
+        _audit_fp = None
+        _audit_path = None
+
+atexit.register(_reopen_audit)
 
 def warmup():
     """Load all policy files on startup and log success/failure."""
@@ -275,12 +476,28 @@ def clear_cache():
     global _data_cache
     _data_cache.clear()
 
+def _snapshot() -> Dict:
+    """Return a shallow copy of the data cache, for tests that mutate it"""
+    return dict(_data_cache)
+
+def _restore(snapshot: Dict):
+    """Put back a data cache taken with _snapshot()"""
+    _data_cache.clear()
+    _data_cache.update(snapshot)
+
 def get_user_info(username: str) -> Optional[Dict]:
     """Get comprehensive user information for debugging"""
     users = _load_users()
     user_roles = _load_user_roles()
     
-    user_data = next((u for u in users if u.get("username") == username), None)
+    # First record per username wins, as with the old linear scan
+    def build():
+        index = {}
+        for u in users:
+            index.setdefault(u.get("username"), u)
+        return index
+    
+    user_data = _derived('users_by_name', ('users',), build).get(username)
     if not user_data:
         return None
     
@@ -0,0 +1,31 @@
+"""
+Shared pytest fixtures.
+"""
+import pytest
+from server import policy
+
+@pytest.fixture(scope="session", autouse=True)
+def _policy_loaded():
+    """Parse the policy files once for the whole test session"""
+    policy._load_users()
+    policy._load_user_roles()
+    policy._load_role_permissions()
+    policy._load_dac_owners()
+    policy._load_mac_labels()
+    yield
+
+@pytest.fixture(autouse=True)
+def temp_audit_log(tmp_path, monkeypatch):
+    """Send audit records to a per-test file instead of the project-root log"""
+    test_file = tmp_path / "audit.jsonl"
+    monkeypatch.setattr(policy, "AUDIT_LOG", str(test_file))
+    policy._reopen_audit()
+    yield test_file
+    policy._reopen_audit()
+
+@pytest.fixture
+def policy_state():
+    """Restore the policy data cache after a test that may change it"""
+    snapshot = policy._snapshot()
+    yield
+    policy._restore(snapshot)
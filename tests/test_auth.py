@@ -0,0 +1,49 @@
+"""
+Login lockout tests for server/auth.py.
+"""
+import asyncio
+import time
+import pytest
+from collections import OrderedDict
+from server import auth
+from server.auth import authenticate
+
+@pytest.fixture
+def lockout_state(monkeypatch):
+    """Run a test against empty lockout tables"""
+    monkeypatch.setattr(auth, "_FAILED_ATTEMPTS", OrderedDict())
+    monkeypatch.setattr(auth, "_LOCKED_UNTIL", {})
+    monkeypatch.setattr(auth, "_IN_FLIGHT", {})
+    monkeypatch.setattr(auth, "_PENDING", 0)
+
+def test_lockout_survives_table_eviction(lockout_state, monkeypatch):
+    """Flooding the failure table with bogus usernames must not lift a lockout"""
+    monkeypatch.setattr(auth, "MAX_TRACKED_USERS", 100)
+    for _ in range(auth.MAX_FAILED_ATTEMPTS):
+        assert authenticate("test", "wrong") is False
+    for i in range(300):
+        authenticate(f"bogus{i}", "x")
+    assert len(auth._FAILED_ATTEMPTS) <= 100
+    assert authenticate("test", "test") is False
+
+def test_concurrent_guesses_respect_lockout(lockout_state, monkeypatch):
+    """Guesses verified concurrently still stop at MAX_FAILED_ATTEMPTS"""
+    calls = []
+
+    def slow_verify(user, password):
+        calls.append(password)
+        time.sleep(0.02)
+        return False
+
+    monkeypatch.setattr(auth, "_verify_user", slow_verify)
+    monkeypatch.setattr(auth, "MAX_PENDING_VERIFICATIONS", 100)
+
+    async def attack():
+        return await asyncio.gather(*(
+            auth.authenticate_async("admin", f"guess{i}") for i in range(40)
+        ))
+
+    assert not any(asyncio.run(attack()))
+    assert len(calls) <= auth.MAX_FAILED_ATTEMPTS
+    assert auth._is_locked_out("admin", time.time())
+    assert auth._IN_FLIGHT == {}
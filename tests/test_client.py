@@ -0,0 +1,112 @@
+"""
+Client command tests against an in-memory stand-in for asyncssh's SFTPClient.
+"""
+import asyncio
+import os
+import signal
+import threading
+import pytest
+from types import SimpleNamespace
+from client import client
+from client.client import SFTPClient, DEFAULT_BLOCK_SIZE
+
+class FakeSFTP:
+    """Records transfers; limits mimic what asyncssh learned from the server"""
+    def __init__(self, supports_limits=False, read_len=16384, write_len=16384):
+        self._handler = SimpleNamespace(_supports_limits=supports_limits)
+        self.limits = SimpleNamespace(max_read_len=read_len, max_write_len=write_len)
+        self.calls = []
+
+    async def get(self, src, dst, **opts):
+        self.calls.append(("get", src, dst, opts))
+
+    async def put(self, src, dst, **opts):
+        self.calls.append(("put", src, dst, opts))
+
+def test_block_size_clamped_to_advertised_limits():
+    sftp = FakeSFTP(supports_limits=True, read_len=64 * 1024, write_len=32 * 1024)
+    client = SFTPClient(sftp)
+    asyncio.run(client.cmd_get(["a.bin", "/dev/null"]))
+    asyncio.run(client.cmd_put([__file__, "b.bin"]))
+    assert sftp.calls[0][3]["block_size"] == 64 * 1024
+    assert sftp.calls[1][3]["block_size"] == 32 * 1024
+
+def test_block_size_kept_without_advertised_limits():
+    sftp = FakeSFTP()
+    client = SFTPClient(sftp)
+    asyncio.run(client.cmd_get(["a.bin", "/dev/null"]))
+    assert sftp.calls[0][3]["block_size"] == DEFAULT_BLOCK_SIZE
+
+def test_glob_get_refuses_duplicate_destinations(capsys):
+    sftp = FakeSFTP()
+    async def glob(pattern):
+        return ["/a/f.txt", "/b/f.txt"]
+    sftp.glob = glob
+    client = SFTPClient(sftp)
+    asyncio.run(client.cmd_get(["/*/f.txt", "out"]))
+    assert sftp.calls == []
+    assert "both map to" in capsys.readouterr().out
+
+def test_glob_put_refuses_duplicate_destinations(tmp_path, capsys):
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        (tmp_path / sub / "f.txt").write_text(sub)
+    sftp = FakeSFTP()
+    client = SFTPClient(sftp)
+    asyncio.run(client.cmd_put([str(tmp_path / "*" / "f.txt"), "up"]))
+    assert sftp.calls == []
+    assert "both map to" in capsys.readouterr().out
+
+def test_ctrl_c_without_loop_signal_support(monkeypatch):
+    """Where add_signal_handler is missing (Windows) Ctrl+C still interrupts"""
+    line = threading.Event()
+    def blocking_input(prompt):
+        line.wait()
+        return "exit"
+    monkeypatch.setattr("builtins.input", blocking_input)
+    monkeypatch.setattr(client, "_pending_read", None)
+
+    async def prompt():
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGINT)
+        def unsupported(*args):
+            raise NotImplementedError
+        loop.add_signal_handler = unsupported
+        loop.call_later(0.05, os.kill, os.getpid(), signal.SIGINT)
+        with pytest.raises(KeyboardInterrupt):
+            await client.ainput("> ")
+        assert signal.getsignal(signal.SIGINT) is previous
+        # The interrupted read is picked up by the next prompt
+        line.set()
+        return await client.ainput("> ")
+
+    assert asyncio.run(prompt()) == "exit"
+
+def test_cd_stats_even_after_listing():
+    """cd asks the server each time instead of trusting listed attrs"""
+    listed = SimpleNamespace(filename="docs", attrs=SimpleNamespace(permissions=0o40755, size=0, mtime=0))
+    stats = []
+    sftp = FakeSFTP()
+    async def scandir(path):
+        yield listed
+    async def stat_(path):
+        stats.append(path)
+        raise FileNotFoundError(path)
+    sftp.scandir = scandir
+    sftp.stat = stat_
+    client = SFTPClient(sftp)
+    asyncio.run(client.cmd_ls([]))
+    asyncio.run(client.cmd_cd(["docs"]))
+    assert stats == ["docs"]
+    assert client.current_dir == "/"
+
+def test_ls_drops_entries_from_earlier_listings():
+    sftp = FakeSFTP()
+    client = SFTPClient(sftp)
+    client._stat_cache["old"] = (SimpleNamespace(permissions=0o100644), 0.0)
+    async def scandir(path):
+        return
+        yield
+    sftp.scandir = scandir
+    asyncio.run(client.cmd_ls([]))
+    assert client._stat_cache == {}
@@ -8,9 +8,12 @@ The SFTP server now integrates fully with the authorization system:
 ✅ Comprehensive audit logging
 ✅ Bell-LaPadula MAC model properly implemented
 ✅ Integration tested and verified
-
-Use the manual integration test (test_integration.py) for verification.
 """
+import struct
+import pytest
+from main import Server, SFTPSession, RECV_COMPACT_THRESHOLD
+from server.policy import authorize
+from server.auth import authenticate
 
 def test_integration_completed():
     """
@@ -42,34 +45,87 @@ def test_integration_completed():
     - editor/editor (confidential clearance, editor role)
     - guest/guest (unclassified clearance, guest role)
     """
-    # Import to verify integration
-    from main import Server, SFTPSession
-    from server.policy import authorize
-    from server.auth import authenticate
-    
     # Verify components exist and are integrated
     assert hasattr(Server, 'validate_password')
     assert hasattr(SFTPSession, '_check_authorization')
-    assert callable(authorize)
-    assert callable(authenticate)
-    
-    # Test that authorization actually works
-    assert authorize("test", "read", "/") == True
-    assert authorize("test", "write", "/") == False
-    assert authorize("test", "read", "/confidential") == False
-    
-    # Test that authentication works  
-    assert authenticate("test", "test") == True
-    assert authenticate("test", "wrong") == False
-    
-    print("✅ SFTP Server Authorization Integration: COMPLETE")
-    print("   Ready for production use with full security controls!")
 
 
-# Simple connection test that can actually be run
-def test_connect_sftp():
-    """Simple test confirming SFTP components are properly integrated."""
-    test_integration_completed()
-    
-    # This replaces the original placeholder
-    assert True  # Integration verified above
+# Policy data is loaded once per session by the conftest fixture
+@pytest.mark.parametrize("user,action,path,expected", [
+    ("test", "read", "/", True),
+    ("test", "write", "/", False),
+    ("test", "read", "/confidential", False),
+])
+def test_authorize_matrix(user, action, path, expected):
+    """Test that authorization actually works"""
+    assert authorize(user, action, path) is expected
+
+@pytest.mark.parametrize("user,password,expected", [
+    ("test", "test", True),
+    ("test", "wrong", False),
+])
+def test_authenticate_matrix(user, password, expected):
+    """Test that authentication works"""
+    assert authenticate(user, password) is expected
+
+class FakeChannel:
+    def write(self, data):
+        pass
+
+    def set_encoding(self, encoding):
+        pass
+
+class RecordingSession(SFTPSession):
+    """Records each packet; optionally keeps a view alive past its handler"""
+    def __init__(self, keep_views=False):
+        super().__init__()
+        self.packets = []
+        self.kept = []
+        self.keep_views = keep_views
+        self.connection_made(FakeChannel())
+
+    def _handle(self, pkt):
+        self.packets.append(bytes(pkt))
+        if self.keep_views:
+            self.kept.append(pkt[:])
+
+def frame(payload):
+    return struct.pack(">I", len(payload)) + payload
+
+PAYLOADS = [bytes([i % 256]) * size for i, size in enumerate((1, 5, 300, 4096, 9, 70000))]
+STREAM = b"".join(frame(p) for p in PAYLOADS)
+
+@pytest.mark.parametrize("chunk", [1, 3, 7, 4100, len(STREAM)])
+def test_receive_split_and_coalesced_packets(chunk):
+    """Packets are reassembled whether split across or packed into reads"""
+    session = RecordingSession()
+    for i in range(0, len(STREAM), chunk):
+        session.data_received(STREAM[i:i + chunk], None)
+    assert session.packets == PAYLOADS
+    assert session._off == 0 and not session.buf
+
+def test_receive_with_packet_view_kept_alive(monkeypatch):
+    """A view held past its handler forces the unpin path, not a crash"""
+    unpinned = []
+    original = SFTPSession._unpin_buffer
+    def spy(self):
+        unpinned.append(self._off)
+        original(self)
+    monkeypatch.setattr(SFTPSession, "_unpin_buffer", spy)
+    session = RecordingSession(keep_views=True)
+    for i in range(0, len(STREAM), 7):
+        session.data_received(STREAM[i:i + 7], None)
+    assert session.packets == PAYLOADS
+    assert [bytes(v) for v in session.kept] == PAYLOADS
+    assert unpinned
+
+def test_receive_compacts_consumed_prefix():
+    """Past RECV_COMPACT_THRESHOLD the parsed prefix is dropped from buf"""
+    big = b"x" * (RECV_COMPACT_THRESHOLD + 1)
+    tail = frame(b"tail")
+    session = RecordingSession()
+    session.data_received(frame(big) + tail[:3], None)
+    assert session._off == 0
+    assert bytes(session.buf) == tail[:3]
+    session.data_received(tail[3:], None)
+    assert session.packets == [big, b"tail"]